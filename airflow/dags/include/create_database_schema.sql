@@ -55,3 +55,25 @@ CREATE TABLE IF NOT EXISTS staging.stg_tracks (
         FOREIGN KEY (album_id)
         REFERENCES staging.stg_albums(album_id)
 );
+
+
+-- Track ID registry: scheduling metadata for Spotify API refreshes
+CREATE TABLE IF NOT EXISTS staging.track_id_registry (
+    track_id TEXT PRIMARY KEY,
+    priority INTEGER NOT NULL DEFAULT 0,
+    last_fetched_at TIMESTAMP,
+    error_count INTEGER NOT NULL DEFAULT 0 CHECK (error_count >= 0),
+    last_error TEXT,
+    is_active BOOLEAN NOT NULL DEFAULT TRUE,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- Next IDs due ordered by staleness (never fetched first)
+CREATE INDEX IF NOT EXISTS idx_track_id_registry_staleness
+ON staging.track_id_registry(last_fetched_at ASC NULLS FIRST, priority DESC, track_id)
+WHERE is_active;
+
+-- Next IDs due ordered by priority
+CREATE INDEX IF NOT EXISTS idx_track_id_registry_priority
+ON staging.track_id_registry(priority DESC, last_fetched_at ASC NULLS FIRST, track_id)
+WHERE is_active;
@@ -0,0 +1,81 @@
+-- Serving layer: materialized views read by dashboards instead of staging.
+-- Each view has a unique index so it can be refreshed CONCURRENTLY
+-- (readers keep seeing the previous snapshot while the refresh runs).
+CREATE SCHEMA IF NOT EXISTS serving;
+
+-- Track lookups (top tracks)
+CREATE MATERIALIZED VIEW IF NOT EXISTS serving.mv_track_performance AS
+SELECT
+    t.track_id,
+    t.name AS track_name,
+    t.album_id,
+    al.name AS album_name,
+    t.artist_id,
+    a.name AS artist_name,
+    t.popularity,
+    t.duration_ms / 1000.0 AS duration_seconds
+FROM staging.stg_tracks t
+LEFT JOIN staging.stg_albums al
+    ON t.album_id = al.album_id
+LEFT JOIN staging.stg_artists a
+    ON t.artist_id = a.artist_id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_mv_track_performance_track_id
+ON serving.mv_track_performance(track_id);
+
+CREATE INDEX IF NOT EXISTS idx_mv_track_performance_popularity
+ON serving.mv_track_performance(popularity DESC NULLS LAST, track_id);
+
+-- Artist catalog size, aggregated per table before joining to avoid row fan-out
+CREATE MATERIALIZED VIEW IF NOT EXISTS serving.mv_artist_catalog AS
+WITH album_stats AS (
+    SELECT main_artist_id AS artist_id, COUNT(*) AS total_albums
+    FROM staging.stg_albums
+    GROUP BY main_artist_id
+),
+track_stats AS (
+    SELECT
+        artist_id,
+        COUNT(*) AS total_tracks,
+        AVG(popularity) AS avg_track_popularity,
+        MAX(popularity) AS max_track_popularity,
+        SUM(duration_ms) / 60000.0 AS total_minutes_of_music
+    FROM staging.stg_tracks
+    GROUP BY artist_id
+)
+SELECT
+    a.artist_id,
+    a.name AS artist_name,
+    COALESCE(als.total_albums, 0) AS total_albums,
+    COALESCE(ts.total_tracks, 0) AS total_tracks,
+    ts.avg_track_popularity,
+    ts.max_track_popularity,
+    COALESCE(ts.total_minutes_of_music, 0) AS total_minutes_of_music
+FROM staging.stg_artists a
+LEFT JOIN album_stats als
+    ON a.artist_id = als.artist_id
+LEFT JOIN track_stats ts
+    ON a.artist_id = ts.artist_id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_mv_artist_catalog_artist_id
+ON serving.mv_artist_catalog(artist_id);
+
+-- Single-row catalog overview, counted per table instead of COUNT(DISTINCT) over joins
+CREATE MATERIALIZED VIEW IF NOT EXISTS serving.mv_catalog_overview AS
+SELECT
+    1 AS overview_id,
+    (SELECT COUNT(*) FROM staging.stg_artists) AS total_artists,
+    (SELECT COUNT(*) FROM staging.stg_albums) AS total_albums,
+    t.total_tracks,
+    t.avg_track_minutes,
+    t.avg_track_popularity
+FROM (
+    SELECT
+        COUNT(*) AS total_tracks,
+        AVG(duration_ms) / 60000.0 AS avg_track_minutes,
+        AVG(popularity) AS avg_track_popularity
+    FROM staging.stg_tracks
+) t;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_mv_catalog_overview_id
+ON serving.mv_catalog_overview(overview_id);
@@ -36,6 +36,7 @@ def extract_upload_date_from_object_key(object_key: str):
     
     Example:
         "/spotify_data/artists/artists_2026-02-07.json" -> datetime.date(2026, 2, 7)
+        "/spotify_data/tracks/tracks_2026-02-07T143005.json" -> datetime.date(2026, 2, 7)
     """
     try:
         # Extract the filename from object key
@@ -45,7 +46,8 @@ def extract_upload_date_from_object_key(object_key: str):
         if "_" not in filename or not filename.endswith(".json"):
             raise ValueError(f"Object key filename '{filename}' is not in the expected format.")
 
-        date_str = filename.split("_")[-1].replace(".json", "")
+        # Keys may carry an upload time after the date (YYYY-MM-DDTHHMMSS)
+        date_str = filename.split("_")[-1].replace(".json", "").split("T")[0]
 
         # Convert to Python date object
         date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
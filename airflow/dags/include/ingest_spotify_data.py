@@ -100,10 +100,14 @@ def upload_json_to_minio(
     minio_access_key: str = None,
     minio_secret_key: str = None,
     secure: bool = False,
-    pretty: bool = True
+    pretty: bool = True,
+    timestamped: bool = False
 ) -> str:
     """
     Upload artists or trackers JSON to MinIO with detailed logging.
+
+    With `timestamped`, the object key carries the upload time as well as the date
+    (e.g. tracks_2026-02-07T143005.json) so several uploads on one day never overwrite each other.
     """
     try:
         logger.info("Starting MinIO upload process...")
@@ -131,7 +135,7 @@ def upload_json_to_minio(
         logger.info(f"Bucket '{bucket_name}' verified/created.")
 
         # Prepare object key
-        timestamp = datetime.now().strftime("%Y-%m-%d")
+        timestamp = datetime.now().strftime("%Y-%m-%dT%H%M%S" if timestamped else "%Y-%m-%d")
         object_key = f"{minio_folder}/{data_category}/{data_category}_{timestamp}.json"
         
 
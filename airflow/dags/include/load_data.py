@@ -5,11 +5,20 @@ from psycopg2.extras import execute_values
 import logging
 
 
+from include.transformation.staging_schema import STAGING_TABLES
+from include.profiling import explain_upsert
+
+
 # Sample Python callable to load bulk data with upsert
-def load_data_to_postgres(table_name, data,pk_column,postgres_conn_id='postgres_spotify_conn'):
+def load_data_to_postgres(table_name, data, postgres_conn_id='postgres_spotify_conn', plan_artifacts=None):
     """
     Perform bulk upsert to a Postgres table using ON CONFLICT.
+    Rows are tuples ordered as the table's StagingTable columns, so they
+    are passed to execute_values without being rebuilt.
     Automatically updates all columns except the primary key.
+
+    When `plan_artifacts` is a dict (profiling mode), the EXPLAIN (ANALYZE, BUFFERS)
+    plan of the upsert is stored in it under "explain_<table_name>.json".
     """
 
     try:
@@ -17,30 +26,21 @@ def load_data_to_postgres(table_name, data,pk_column,postgres_conn_id='postgres_
         if not data:
             return
 
+        table = STAGING_TABLES[table_name]
+
         hook = PostgresHook(postgres_conn_id=postgres_conn_id)
         conn = hook.get_conn()
-        cursor = conn.cursor()
 
-
-        # Get columns dynamically from first row
-        columns = list(data[0].keys())
-
-        # Build query
-        insert_query = f"""
-        INSERT INTO staging.{table_name} ({', '.join(columns)})
-        VALUES %s
-        ON CONFLICT ({pk_column}) DO UPDATE SET
-        {', '.join([f"{col} = EXCLUDED.{col}" for col in columns if col != pk_column])};
-        """
-
-        # Prepare data as list of tuples
-        values = [tuple(row[col] for col in columns) for row in data]
+        # Build query from the shared staging schema
+        insert_query = table.upsert_query()
 
         with conn.cursor() as cur:
-            execute_values(cur, insert_query, values)
+            if plan_artifacts is not None:
+                plan_artifacts[f"explain_{table_name}.json"] = explain_upsert(cur, insert_query, data)
+
+            execute_values(cur, insert_query, data)
             conn.commit()
     
     except Exception as e:
         logging.error(f"Error Occured When trying to load the data: {e}")
         raise
-        
\ No newline at end of file
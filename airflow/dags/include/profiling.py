@@ -0,0 +1,334 @@
+from airflow.providers.postgres.hooks.postgres import PostgresHook
+from psycopg2.extras import execute_values
+from contextlib import contextmanager
+from botocore.exceptions import BotoCoreError, ClientError
+import cProfile
+import pstats
+import marshal
+import glob
+import json
+import io
+import os
+import re
+import logging
+from datetime import datetime, timezone
+import boto3
+
+from include.ingest_spotify_data import create_bucket_if_not_exists
+
+
+
+logger = logging.getLogger("spotify_pipeline")
+
+
+# Opt-in profiling for the load and dbt stages.
+# Artifacts are stored per run in MinIO under
+#   <ARTIFACTS_BUCKET>/profiling/<run_id>/<task_id>/<artifact>
+# so hot spots can be diffed between runs.
+
+# Kept apart from the raw bucket, whose "tracks" objects are all transformed
+ARTIFACTS_BUCKET = "pipeline-artifacts"
+TOP_FUNCTIONS_LIMIT = 50
+TOP_STATEMENTS_LIMIT = 50
+
+# pg_stat_statements rows are identified by the full key, not queryid alone (toplevel: PG14+)
+PG_STAT_STATEMENTS_KEY = ("userid", "dbid", "queryid", "toplevel")
+PG_STAT_STATEMENTS_COUNTERS = ("calls", "total_exec_time", "rows", "shared_blks_hit", "shared_blks_read")
+
+
+def _artifact_key(run_id: str, task_id: str, name: str) -> str:
+    """
+    Build the object key of a profiling artifact (run IDs contain ':' and '+').
+    """
+    safe_run_id = re.sub(r"[^A-Za-z0-9._=-]", "_", str(run_id))
+    return f"profiling/{safe_run_id}/{task_id}/{name}"
+
+
+def upload_profiling_artifacts(artifacts: dict, run_id: str, task_id: str, bucket_name: str = ARTIFACTS_BUCKET):
+    """
+    Upload artifacts to MinIO. Values may be bytes, str or JSON-serializable objects.
+    Failures are logged and never fail the profiled task.
+    """
+    if not artifacts:
+        return
+
+    try:
+        s3_client = boto3.client(
+            "s3",
+            endpoint_url=f"http://{os.environ.get('MINIO_ENDPOINT', 'minio:9000')}",
+            aws_access_key_id=os.environ.get("MINIO_ACCESS_KEY", "minioadmin"),
+            aws_secret_access_key=os.environ.get("MINIO_SECRET_KEY", "minioadmin123"),
+        )
+        create_bucket_if_not_exists(s3_client, bucket_name)
+
+        for name, content in artifacts.items():
+            if isinstance(content, bytes):
+                body = content
+            elif isinstance(content, str):
+                body = content.encode("utf-8")
+            else:
+                body = json.dumps(content, indent=2, default=str).encode("utf-8")
+
+            object_key = _artifact_key(run_id, task_id, name)
+            s3_client.upload_fileobj(io.BytesIO(body), bucket_name, object_key)
+            logger.info(f"Uploaded profiling artifact to '{bucket_name}/{object_key}'.")
+
+    except (BotoCoreError, ClientError) as e:
+        logger.error(f"Failed to upload profiling artifacts: {e}")
+
+
+def download_profiling_artifact(run_id: str, task_id: str, name: str, bucket_name: str = ARTIFACTS_BUCKET):
+    """
+    Read back a JSON artifact stored by upload_profiling_artifacts.
+    Returns None (with a warning) if it does not exist or cannot be read.
+    """
+    object_key = _artifact_key(run_id, task_id, name)
+    try:
+        s3_client = boto3.client(
+            "s3",
+            endpoint_url=f"http://{os.environ.get('MINIO_ENDPOINT', 'minio:9000')}",
+            aws_access_key_id=os.environ.get("MINIO_ACCESS_KEY", "minioadmin"),
+            aws_secret_access_key=os.environ.get("MINIO_SECRET_KEY", "minioadmin123"),
+        )
+        s3_obj = s3_client.get_object(Bucket=bucket_name, Key=object_key)
+        return json.loads(s3_obj["Body"].read().decode("utf-8"))
+
+    except (BotoCoreError, ClientError, ValueError) as e:
+        logger.warning(f"Failed to read profiling artifact '{bucket_name}/{object_key}': {e}")
+        return None
+
+
+def _top_functions(stats: pstats.Stats, limit: int = TOP_FUNCTIONS_LIMIT) -> list[dict]:
+    """
+    Summarise the most expensive functions by cumulative time, in a diffable form.
+    """
+    rows = []
+    for (filename, line, func), (cc, ncalls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            "function": f"{filename}:{line}({func})",
+            "ncalls": ncalls,
+            "primitive_calls": cc,
+            "tottime": round(tottime, 6),
+            "cumtime": round(cumtime, 6),
+        })
+    rows.sort(key=lambda row: row["cumtime"], reverse=True)
+    return rows[:limit]
+
+
+@contextmanager
+def profile_task(enabled: bool, run_id: str, task_id: str):
+    """
+    cProfile the enclosed block when `enabled`, then upload the profile
+    together with any artifacts added to the yielded dict by the caller.
+
+    Usage:
+        with profile_task(PIPELINE_PROFILING, run_id, task_id) as artifacts:
+            ...
+            artifacts["explain_stg_tracks.json"] = plan
+    """
+    artifacts = {}
+    if not enabled:
+        yield artifacts
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield artifacts
+    finally:
+        profiler.disable()
+
+        stats_text = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stats_text)
+        stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS_LIMIT)
+
+        # Binary pstats format, readable with pstats.Stats(path) or snakeviz
+        artifacts["cprofile.prof"] = marshal.dumps(stats.stats)
+        artifacts["cprofile_top.txt"] = stats_text.getvalue()
+        artifacts["cprofile_top.json"] = _top_functions(stats)
+
+        upload_profiling_artifacts(artifacts, run_id, task_id)
+
+
+def explain_upsert(cur, insert_query: str, rows: list, sample_size: int = 100):
+    """
+    Capture EXPLAIN (ANALYZE, BUFFERS) of a bulk upsert on a sample of rows.
+    The statement really executes, so it runs inside a savepoint that is rolled back.
+
+    Returns:
+        The JSON plan, or None if it could not be captured
+    """
+    sample = rows[:sample_size]
+    if not sample:
+        return None
+
+    cur.execute("SAVEPOINT explain_upsert;")
+    try:
+        result = execute_values(
+            cur,
+            "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + insert_query,
+            sample,
+            page_size=len(sample),
+            fetch=True,
+        )
+        return {"sample_rows": len(sample), "plan": result[0][0]}
+    except Exception as e:
+        logger.warning(f"Failed to capture upsert plan: {e}")
+        return None
+    finally:
+        cur.execute("ROLLBACK TO SAVEPOINT explain_upsert;")
+
+
+def ensure_pg_stat_statements(postgres_conn_id='postgres_spotify_conn') -> bool:
+    """
+    Create the pg_stat_statements extension if possible. Only called in profiling
+    mode: the extension needs superuser, so failures are logged, not raised.
+    """
+    try:
+        hook = PostgresHook(postgres_conn_id=postgres_conn_id)
+        conn = hook.get_conn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("CREATE EXTENSION IF NOT EXISTS pg_stat_statements;")
+                conn.commit()
+            return True
+        finally:
+            conn.close()
+
+    except Exception as e:
+        logger.warning(f"pg_stat_statements extension unavailable: {e}")
+        return False
+
+
+def snapshot_pg_stat_statements(postgres_conn_id='postgres_spotify_conn') -> list[dict]:
+    """
+    Read pg_stat_statements counters for the current database.
+    Returns an empty list (with a warning) when the extension is unavailable.
+    """
+    query = """
+    SELECT userid, dbid, queryid, toplevel, query, calls, total_exec_time, rows, shared_blks_hit, shared_blks_read
+    FROM pg_stat_statements
+    WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database());
+    """
+
+    try:
+        hook = PostgresHook(postgres_conn_id=postgres_conn_id)
+        conn = hook.get_conn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(query)
+                columns = [col.name for col in cur.description]
+                return [dict(zip(columns, row)) for row in cur.fetchall()]
+        finally:
+            conn.close()
+
+    except Exception as e:
+        logger.warning(f"pg_stat_statements snapshot unavailable: {e}")
+        return []
+
+
+def diff_pg_stat_statements(before: list[dict], after: list[dict], limit: int = TOP_STATEMENTS_LIMIT) -> list[dict]:
+    """
+    Per-statement counter deltas between two snapshots, most expensive first.
+    The profiler's own EXPLAIN statements are left out: they re-run the measured
+    queries and would otherwise top the list.
+    """
+    before_by_key = {tuple(row[col] for col in PG_STAT_STATEMENTS_KEY): row for row in before}
+
+    deltas = []
+    for row in after:
+        if row["query"].lstrip().upper().startswith("EXPLAIN"):
+            continue
+
+        key = tuple(row[col] for col in PG_STAT_STATEMENTS_KEY)
+        previous = before_by_key.get(key, {})
+        delta = {counter: row[counter] - previous.get(counter, 0) for counter in PG_STAT_STATEMENTS_COUNTERS}
+        if delta["calls"] > 0:
+            deltas.append({**dict(zip(PG_STAT_STATEMENTS_KEY, key)), "query": row["query"], **delta})
+
+    deltas.sort(key=lambda row: row["total_exec_time"], reverse=True)
+    return deltas[:limit]
+
+
+def compact_pg_stat_statements(snapshot: list[dict]) -> list[dict]:
+    """
+    Keep only the key and counters of a snapshot (no query text), for storing a baseline.
+    """
+    columns = PG_STAT_STATEMENTS_KEY + PG_STAT_STATEMENTS_COUNTERS
+    return [{col: row[col] for col in columns} for row in snapshot]
+
+
+def dbt_run_results_generated_at(run_results_path: str):
+    """
+    Return when dbt wrote run_results.json (metadata.generated_at, UTC), or None if unknown.
+    """
+    with open(run_results_path, "r") as f:
+        generated_at = json.load(f).get("metadata", {}).get("generated_at")
+
+    if not generated_at:
+        return None
+
+    # dbt writes e.g. "2026-02-07T12:00:00.123456Z"
+    parsed = datetime.fromisoformat(generated_at.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def parse_dbt_run_results(run_results_path: str) -> list[dict]:
+    """
+    Extract per-model timings from dbt's target/run_results.json, slowest first.
+    """
+    with open(run_results_path, "r") as f:
+        run_results = json.load(f)
+
+    timings = []
+    for result in run_results.get("results", []):
+        phases = {phase["name"]: phase for phase in result.get("timing", [])}
+        timings.append({
+            "unique_id": result.get("unique_id"),
+            "status": result.get("status"),
+            "execution_time": result.get("execution_time"),
+            "compile_started_at": phases.get("compile", {}).get("started_at"),
+            "execute_started_at": phases.get("execute", {}).get("started_at"),
+            "execute_completed_at": phases.get("execute", {}).get("completed_at"),
+            "rows_affected": result.get("adapter_response", {}).get("rows_affected"),
+        })
+
+    timings.sort(key=lambda row: row["execution_time"] or 0, reverse=True)
+    return timings
+
+
+def explain_compiled_models(compiled_models_dir: str, postgres_conn_id='postgres_spotify_conn') -> dict:
+    """
+    Capture EXPLAIN (ANALYZE, BUFFERS) for every compiled dbt model SELECT
+    found in `compiled_models_dir` (e.g. target/compiled/<project>/models/mart).
+
+    Returns:
+        dict: model name -> JSON plan
+    """
+    plans = {}
+    model_paths = sorted(glob.glob(os.path.join(compiled_models_dir, "*.sql")))
+    if not model_paths:
+        logger.warning(f"No compiled models found in '{compiled_models_dir}'.")
+        return plans
+
+    hook = PostgresHook(postgres_conn_id=postgres_conn_id)
+    conn = hook.get_conn()
+    try:
+        for model_path in model_paths:
+            model_name = os.path.splitext(os.path.basename(model_path))[0]
+            with open(model_path, "r") as f:
+                model_sql = f.read().strip().rstrip(";")
+
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {model_sql}")
+                    plans[model_name] = cur.fetchone()[0]
+            except Exception as e:
+                logger.warning(f"Failed to capture plan for model '{model_name}': {e}")
+            finally:
+                # Read-only SELECTs: never keep anything from the EXPLAIN ANALYZE runs
+                conn.rollback()
+    finally:
+        conn.close()
+
+    return plans
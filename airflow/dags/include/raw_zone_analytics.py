@@ -0,0 +1,330 @@
+import os
+import logging
+from datetime import date
+import boto3
+import duckdb
+
+from include.helpers import extract_upload_date_from_object_key
+from include.ingest_spotify_data import create_bucket_if_not_exists
+
+
+
+logger = logging.getLogger("spotify_pipeline")
+
+
+# Embedded DuckDB engine over the MinIO raw zone.
+# Exposes the same artist/album/track tables as transform_tracks_data, without
+# going through Postgres, for ad-hoc historical queries and reconciliation checks.
+#
+# Usage:
+#     con = connect_raw_zone()
+#     register_raw_json_views(con, start_date=date(2026, 2, 1))
+#     con.sql("SELECT created_at, COUNT(*) FROM tracks GROUP BY 1").show()
+
+
+RAW_BUCKET = "row-data"
+RAW_TRACKS_PREFIX = "spotify_data/tracks/"
+
+# Columnar copies live in their own bucket: prepare_staging_data processes
+# every object of the raw bucket whose key contains "tracks"
+COLUMNAR_BUCKET = "columnar-data"
+COLUMNAR_TRACKS_PREFIX = "spotify_data/tracks"
+
+# Only the fields used by transform_tracks_data are read from the raw JSON
+RAW_TRACKS_COLUMNS = """{'tracks': 'STRUCT(
+    id VARCHAR, name VARCHAR, popularity INTEGER, duration_ms INTEGER,
+    track_number INTEGER, disc_number INTEGER, is_local BOOLEAN,
+    album STRUCT(
+        id VARCHAR, name VARCHAR, release_date VARCHAR, release_date_precision VARCHAR,
+        total_tracks INTEGER, album_type VARCHAR,
+        artists STRUCT(id VARCHAR, name VARCHAR)[]
+    )
+)[]'}"""
+
+
+def _sql_literal(value) -> str:
+    """
+    Quote a value as a SQL string literal.
+    """
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def connect_raw_zone(
+    minio_endpoint: str = None,
+    minio_access_key: str = None,
+    minio_secret_key: str = None,
+    secure: bool = False,
+    database: str = ":memory:"
+) -> duckdb.DuckDBPyConnection:
+    """
+    Open a DuckDB connection able to read s3:// objects from MinIO.
+    """
+    minio_endpoint = minio_endpoint or os.environ.get("MINIO_ENDPOINT", "minio:9000")
+    minio_access_key = minio_access_key or os.environ.get("MINIO_ACCESS_KEY", "minioadmin")
+    minio_secret_key = minio_secret_key or os.environ.get("MINIO_SECRET_KEY", "minioadmin123")
+
+    try:
+        con = duckdb.connect(database)
+        con.execute("INSTALL httpfs; LOAD httpfs;")
+        con.execute(f"""
+        CREATE OR REPLACE SECRET minio_raw_zone (
+            TYPE S3,
+            KEY_ID {_sql_literal(minio_access_key)},
+            SECRET {_sql_literal(minio_secret_key)},
+            ENDPOINT {_sql_literal(minio_endpoint)},
+            URL_STYLE 'path',
+            USE_SSL {str(secure).lower()}
+        );
+        """)
+        logger.info(f"DuckDB connected to MinIO endpoint '{minio_endpoint}' (secure={secure}).")
+        return con
+
+    except duckdb.Error as e:
+        logger.error(f"Failed to initialise DuckDB raw zone connection: {e}")
+        raise
+
+
+def list_raw_track_objects(
+    s3_client=None,
+    bucket_name: str = RAW_BUCKET,
+    prefix: str = RAW_TRACKS_PREFIX,
+    start_date: date = None,
+    end_date: date = None
+) -> list[str]:
+    """
+    List raw tracks objects as s3:// URIs, keeping only upload dates within
+    [start_date, end_date]. Filtering on the object key means files outside
+    the range are never downloaded.
+    """
+    if s3_client is None:
+        s3_client = boto3.client(
+            "s3",
+            endpoint_url=f"http://{os.environ.get('MINIO_ENDPOINT', 'minio:9000')}",
+            aws_access_key_id=os.environ.get("MINIO_ACCESS_KEY", "minioadmin"),
+            aws_secret_access_key=os.environ.get("MINIO_SECRET_KEY", "minioadmin123"),
+        )
+
+    uris = []
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            object_key = obj["Key"]
+            if not object_key.endswith(".json"):
+                continue
+
+            upload_date = extract_upload_date_from_object_key(object_key)
+            if start_date and upload_date < start_date:
+                continue
+            if end_date and upload_date > end_date:
+                continue
+            uris.append(f"s3://{bucket_name}/{object_key}")
+
+    logger.info(f"Found {len(uris)} raw tracks objects in '{bucket_name}/{prefix}'.")
+    return uris
+
+
+def _raw_rows_from_json(sources: list[str]) -> str:
+    """
+    SELECT flattening raw tracks JSON files into one row per track.
+    """
+    files = "[" + ", ".join(_sql_literal(source) for source in sources) + "]"
+    return f"""
+    WITH files AS (
+        SELECT
+            filename AS object_key,
+            CAST(regexp_extract(filename, '_(\\d{{4}}-\\d{{2}}-\\d{{2}})(T\\d{{6}})?\\.json$', 1) AS DATE) AS upload_date,
+            UNNEST(tracks) AS track,
+            UNNEST(range(len(tracks))) AS track_position
+        FROM read_json({files}, columns = {RAW_TRACKS_COLUMNS}, filename = true, format = 'auto')
+    )
+    SELECT
+        object_key,
+        upload_date,
+        track_position,
+        track.id AS track_id,
+        track.name AS track_name,
+        track.popularity AS popularity,
+        track.duration_ms AS duration_ms,
+        track.track_number AS track_number,
+        track.disc_number AS disc_number,
+        COALESCE(track.is_local, false) AS is_local,
+        track.album.id AS album_id,
+        track.album.name AS album_name,
+        track.album.release_date AS raw_release_date,
+        track.album.release_date_precision AS release_date_precision,
+        track.album.total_tracks AS total_tracks,
+        track.album.album_type AS album_type,
+        track.album.artists[1].id AS artist_id,
+        track.album.artists[1].name AS artist_name
+    FROM files
+    WHERE track.id IS NOT NULL
+    """
+
+
+def _raw_rows_from_parquet(parquet_uri: str, start_date: date = None, end_date: date = None) -> str:
+    """
+    SELECT over the columnar copies. The upload_date hive partition filter
+    prunes whole directories before any file is opened.
+    """
+    filters = []
+    if start_date:
+        filters.append(f"upload_date >= DATE '{start_date.isoformat()}'")
+    if end_date:
+        filters.append(f"upload_date <= DATE '{end_date.isoformat()}'")
+    where_clause = f"WHERE {' AND '.join(filters)}" if filters else ""
+
+    return f"""
+    SELECT *
+    FROM read_parquet(
+        {_sql_literal(parquet_uri.rstrip('/') + '/*/*.parquet')},
+        hive_partitioning = true,
+        hive_types = {{'upload_date': DATE}}
+    )
+    {where_clause}
+    """
+
+
+def _create_flattened_views(con: duckdb.DuckDBPyConnection, raw_rows_sql: str):
+    """
+    Create raw_track_rows plus the artists, albums and tracks views.
+    Columns match transform_tracks_data; artists and albums are deduplicated
+    per source file keeping the first occurrence, as the Python transform does.
+    """
+    con.execute(f"CREATE OR REPLACE VIEW raw_track_rows AS {raw_rows_sql};")
+
+    con.execute("""
+    CREATE OR REPLACE VIEW artists AS
+    SELECT DISTINCT ON (object_key, artist_id)
+        artist_id,
+        artist_name AS name,
+        upload_date AS created_at,
+        object_key
+    FROM raw_track_rows
+    WHERE artist_id IS NOT NULL
+    ORDER BY object_key, artist_id, track_position;
+    """)
+
+    con.execute("""
+    CREATE OR REPLACE VIEW albums AS
+    SELECT DISTINCT ON (object_key, album_id)
+        album_id,
+        artist_id AS main_artist_id,
+        album_name AS name,
+        CASE length(raw_release_date)
+            WHEN 10 THEN try_strptime(raw_release_date, '%Y-%m-%d')
+            WHEN 7 THEN try_strptime(raw_release_date, '%Y-%m')
+            WHEN 4 THEN try_strptime(raw_release_date, '%Y')
+        END::DATE AS release_date,
+        release_date_precision,
+        total_tracks,
+        album_type,
+        upload_date AS created_at,
+        object_key
+    FROM raw_track_rows
+    WHERE album_id IS NOT NULL
+    ORDER BY object_key, album_id, track_position;
+    """)
+
+    con.execute("""
+    CREATE OR REPLACE VIEW tracks AS
+    SELECT
+        track_id,
+        track_name AS name,
+        artist_id,
+        album_id,
+        popularity,
+        duration_ms,
+        track_number,
+        disc_number,
+        is_local,
+        upload_date AS created_at,
+        object_key
+    FROM raw_track_rows;
+    """)
+
+
+def register_raw_json_views(
+    con: duckdb.DuckDBPyConnection,
+    sources: list[str] = None,
+    start_date: date = None,
+    end_date: date = None,
+    s3_client=None
+) -> list[str]:
+    """
+    Register the flattened views over raw tracks JSON objects.
+
+    Args:
+        sources: explicit s3:// URIs or local paths; listed from MinIO when omitted
+        start_date, end_date: upload date range used to select objects
+
+    Returns:
+        list[str]: the sources the views read from
+    """
+    if sources is None:
+        sources = list_raw_track_objects(s3_client, start_date=start_date, end_date=end_date)
+
+    if not sources:
+        raise ValueError("No raw tracks objects found for the requested upload dates.")
+
+    _create_flattened_views(con, _raw_rows_from_json(sources))
+    logger.info(f"Registered raw zone views over {len(sources)} JSON objects.")
+    return sources
+
+
+def register_parquet_views(
+    con: duckdb.DuckDBPyConnection,
+    parquet_uri: str = f"s3://{COLUMNAR_BUCKET}/{COLUMNAR_TRACKS_PREFIX}",
+    start_date: date = None,
+    end_date: date = None
+):
+    """
+    Register the flattened views over the columnar copies written by
+    export_raw_tracks_to_parquet.
+    """
+    _create_flattened_views(con, _raw_rows_from_parquet(parquet_uri, start_date, end_date))
+    logger.info(f"Registered raw zone views over columnar copies at '{parquet_uri}'.")
+
+
+def export_raw_tracks_to_parquet(
+    con: duckdb.DuckDBPyConnection,
+    target_uri: str = f"s3://{COLUMNAR_BUCKET}/{COLUMNAR_TRACKS_PREFIX}",
+    s3_client=None
+):
+    """
+    Write raw_track_rows as Parquet partitioned by upload_date.
+    register_raw_json_views must have been called on `con` first.
+    """
+    if target_uri.startswith("s3://") and s3_client is not None:
+        create_bucket_if_not_exists(s3_client, target_uri[len("s3://"):].split("/")[0])
+
+    try:
+        con.execute(f"""
+        COPY (SELECT * FROM raw_track_rows)
+        TO {_sql_literal(target_uri)}
+        (FORMAT PARQUET, PARTITION_BY (upload_date), OVERWRITE_OR_IGNORE true);
+        """)
+        logger.info(f"Exported raw tracks to Parquet at '{target_uri}'.")
+
+    except duckdb.Error as e:
+        logger.error(f"Failed to export raw tracks to Parquet: {e}")
+        raise
+
+
+def raw_zone_counts_by_upload_date(con: duckdb.DuckDBPyConnection) -> list[tuple]:
+    """
+    Reconciliation check: distinct artists, albums and tracks per upload date,
+    to compare against the staging tables' created_at counts.
+
+    Returns:
+        list[tuple]: (upload_date, artists, albums, tracks) ordered by upload_date
+    """
+    return con.execute("""
+    SELECT
+        upload_date,
+        COUNT(DISTINCT artist_id) AS artists,
+        COUNT(DISTINCT album_id) AS albums,
+        COUNT(DISTINCT track_id) AS tracks
+    FROM raw_track_rows
+    GROUP BY upload_date
+    ORDER BY upload_date;
+    """).fetchall()
@@ -0,0 +1,5 @@
+-- Refresh serving views without blocking readers (requires the unique indexes
+-- created in create_serving_layer.sql)
+REFRESH MATERIALIZED VIEW CONCURRENTLY serving.mv_track_performance;
+REFRESH MATERIALIZED VIEW CONCURRENTLY serving.mv_artist_catalog;
+REFRESH MATERIALIZED VIEW CONCURRENTLY serving.mv_catalog_overview;
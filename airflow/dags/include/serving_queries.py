@@ -0,0 +1,146 @@
+from airflow.providers.postgres.hooks.postgres import PostgresHook
+from collections import OrderedDict
+from functools import wraps
+import threading
+import logging
+import time
+
+
+logger = logging.getLogger("spotify_pipeline")
+
+
+# Default time-to-live of cached query results, in seconds.
+# The serving views only change once per pipeline run, so a few minutes is safe.
+DEFAULT_TTL_SECONDS = 300
+
+# Maximum cached argument tuples per function (e.g. distinct artist IDs looked up)
+DEFAULT_CACHE_MAXSIZE = 1024
+
+
+def ttl_cache(ttl_seconds: float = DEFAULT_TTL_SECONDS, maxsize: int = DEFAULT_CACHE_MAXSIZE):
+    """
+    Cache a function's results per argument tuple for `ttl_seconds`,
+    keeping at most `maxsize` entries (entries closest to expiry are evicted first).
+    The wrapped function exposes `cache_clear()` to drop all entries.
+    """
+    def decorator(func):
+        # Insertion order == expiry order, since every entry gets the same TTL
+        entries = OrderedDict()
+        lock = threading.Lock()
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            now = time.monotonic()
+
+            with lock:
+                entry = entries.get(key)
+                if entry and entry[0] > now:
+                    return entry[1]
+
+            result = func(*args, **kwargs)
+
+            with lock:
+                entries.pop(key, None)
+                entries[key] = (now + ttl_seconds, result)
+
+                # Drop expired entries, then the oldest ones beyond maxsize
+                while entries:
+                    oldest_key, (expires_at, _) = next(iter(entries.items()))
+                    if expires_at > now and len(entries) <= maxsize:
+                        break
+                    del entries[oldest_key]
+            return result
+
+        def cache_clear():
+            with lock:
+                entries.clear()
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+
+    return decorator
+
+
+def _fetch_records(query: str, parameters=None, postgres_conn_id='postgres_spotify_conn') -> list[dict]:
+    """
+    Run a read-only query against the serving schema and return rows as dicts.
+    """
+    try:
+        hook = PostgresHook(postgres_conn_id=postgres_conn_id)
+        conn = hook.get_conn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(query, parameters)
+                columns = [col.name for col in cur.description]
+                return [dict(zip(columns, row)) for row in cur.fetchall()]
+        finally:
+            conn.close()
+
+    except Exception as e:
+        logging.error(f"Error Occured When trying to query the serving layer: {e}")
+        raise
+
+
+@ttl_cache()
+def get_top_tracks(limit: int = 10, postgres_conn_id='postgres_spotify_conn') -> list[dict]:
+    """
+    Return the `limit` most popular tracks with their album and artist names.
+    """
+    query = """
+    SELECT track_id, track_name, album_name, artist_name, popularity, duration_seconds
+    FROM serving.mv_track_performance
+    ORDER BY popularity DESC NULLS LAST, track_id
+    LIMIT %s;
+    """
+    return _fetch_records(query, (limit,), postgres_conn_id)
+
+
+@ttl_cache()
+def get_artist_catalog_size(artist_id: str, postgres_conn_id='postgres_spotify_conn'):
+    """
+    Return the catalog size (albums, tracks, minutes of music) of one artist,
+    or None if the artist is unknown.
+    """
+    query = """
+    SELECT artist_id, artist_name, total_albums, total_tracks, total_minutes_of_music
+    FROM serving.mv_artist_catalog
+    WHERE artist_id = %s;
+    """
+    rows = _fetch_records(query, (artist_id,), postgres_conn_id)
+    return rows[0] if rows else None
+
+
+@ttl_cache()
+def get_largest_artist_catalogs(limit: int = 10, postgres_conn_id='postgres_spotify_conn') -> list[dict]:
+    """
+    Return the `limit` artists with the most tracks.
+    """
+    query = """
+    SELECT artist_id, artist_name, total_albums, total_tracks, total_minutes_of_music
+    FROM serving.mv_artist_catalog
+    ORDER BY total_tracks DESC, artist_id
+    LIMIT %s;
+    """
+    return _fetch_records(query, (limit,), postgres_conn_id)
+
+
+@ttl_cache()
+def get_catalog_overview(postgres_conn_id='postgres_spotify_conn'):
+    """
+    Return the global catalog metrics. The view always holds exactly one row
+    (zero counts before the first load).
+    """
+    query = """
+    SELECT total_artists, total_albums, total_tracks, avg_track_minutes, avg_track_popularity
+    FROM serving.mv_catalog_overview;
+    """
+    return _fetch_records(query, None, postgres_conn_id)[0]
+
+
+def clear_serving_cache():
+    """
+    Drop every cached serving result, e.g. right after the views are refreshed.
+    """
+    for query_func in (get_top_tracks, get_artist_catalog_size, get_largest_artist_catalogs, get_catalog_overview):
+        query_func.cache_clear()
@@ -0,0 +1,215 @@
+from airflow.providers.postgres.hooks.postgres import PostgresHook
+from psycopg2.extras import execute_values
+from datetime import timedelta
+import logging
+
+from include.ingest_spotify_data import read_spotify_ids
+
+
+logger = logging.getLogger("spotify_pipeline")
+
+
+REGISTRY_TABLE = "staging.track_id_registry"
+
+# Orderings supported when selecting the next IDs due for refresh.
+# Both are backed by a partial index in create_database_schema.sql
+DUE_ORDERINGS = {
+    "staleness": "last_fetched_at ASC NULLS FIRST, priority DESC, track_id",
+    "priority": "priority DESC, last_fetched_at ASC NULLS FIRST, track_id",
+}
+
+
+def _build_due_query(order_by: str, stale_after: timedelta = None) -> str:
+    """
+    Build the SELECT used to find track IDs due for refresh.
+    """
+    if order_by not in DUE_ORDERINGS:
+        raise ValueError(f"Unsupported ordering '{order_by}', expected one of {list(DUE_ORDERINGS)}")
+
+    staleness_filter = ""
+    if stale_after is not None:
+        staleness_filter = "AND (last_fetched_at IS NULL OR last_fetched_at < NOW() - %(stale_after)s)"
+
+    return f"""
+    SELECT track_id
+    FROM {REGISTRY_TABLE}
+    WHERE is_active
+      AND error_count < %(max_error_count)s
+      {staleness_filter}
+    ORDER BY {DUE_ORDERINGS[order_by]}
+    """
+
+
+def import_track_ids_from_json(json_file_path: str, priority: int = 0, postgres_conn_id='postgres_spotify_conn') -> int:
+    """
+    Bulk import track IDs from the spotify_ids JSON file into the registry.
+    IDs already registered are left untouched so their scheduling metadata is kept.
+
+    Returns:
+        int: number of newly registered track IDs
+    """
+    try:
+        # Deduplicate while keeping the file order
+        track_ids = list(dict.fromkeys(read_spotify_ids(json_file_path)))
+        if not track_ids:
+            return 0
+
+        hook = PostgresHook(postgres_conn_id=postgres_conn_id)
+        conn = hook.get_conn()
+
+        insert_query = f"""
+        INSERT INTO {REGISTRY_TABLE} (track_id, priority)
+        VALUES %s
+        ON CONFLICT (track_id) DO NOTHING
+        RETURNING track_id;
+        """
+
+        try:
+            with conn.cursor() as cur:
+                inserted = execute_values(
+                    cur, insert_query, [(track_id, priority) for track_id in track_ids], page_size=1000, fetch=True
+                )
+                conn.commit()
+        finally:
+            conn.close()
+
+        logger.info(f"Registered {len(inserted)} new track IDs out of {len(track_ids)} in '{json_file_path}'.")
+        return len(inserted)
+
+    except Exception as e:
+        logging.error(f"Error Occured When trying to import track IDs into the registry: {e}")
+        raise
+
+
+def get_due_track_ids(
+    limit: int,
+    order_by: str = "staleness",
+    stale_after: timedelta = None,
+    max_error_count: int = 5,
+    postgres_conn_id='postgres_spotify_conn'
+) -> list[str]:
+    """
+    Return the next `limit` track IDs due for refresh.
+
+    Args:
+        limit: maximum number of IDs to return
+        order_by: "staleness" (oldest fetch first) or "priority" (highest priority first)
+        stale_after: only return IDs not fetched within this interval (None returns any active ID)
+        max_error_count: IDs that failed this many times in a row are skipped
+    """
+    if limit <= 0:
+        raise ValueError("limit must be a positive integer.")
+
+    query = _build_due_query(order_by, stale_after) + "LIMIT %(limit)s;"
+    params = {"max_error_count": max_error_count, "stale_after": stale_after, "limit": limit}
+
+    try:
+        hook = PostgresHook(postgres_conn_id=postgres_conn_id)
+        conn = hook.get_conn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                return [row[0] for row in cur.fetchall()]
+        finally:
+            conn.close()
+
+    except Exception as e:
+        logging.error(f"Error Occured When trying to read due track IDs from the registry: {e}")
+        raise
+
+
+def iter_due_track_id_batches(
+    batch_size: int,
+    order_by: str = "staleness",
+    stale_after: timedelta = None,
+    max_error_count: int = 5,
+    postgres_conn_id='postgres_spotify_conn'
+):
+    """
+    Yield lists of at most `batch_size` track IDs due for refresh.
+
+    Uses a server-side (named) cursor so only one batch is held in memory at a time,
+    which keeps memory flat however large the registry grows.
+    """
+    if batch_size <= 0:
+        raise ValueError("batch_size must be a positive integer.")
+
+    query = _build_due_query(order_by, stale_after)
+    params = {"max_error_count": max_error_count, "stale_after": stale_after}
+
+    hook = PostgresHook(postgres_conn_id=postgres_conn_id)
+    conn = hook.get_conn()
+    try:
+        with conn.cursor(name="due_track_ids_cursor") as cur:
+            cur.itersize = batch_size
+            cur.execute(query, params)
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [row[0] for row in rows]
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def mark_track_ids_fetched(track_ids: list[str], postgres_conn_id='postgres_spotify_conn'):
+    """
+    Record a successful fetch: stamp last_fetched_at and reset the error counter.
+    """
+    if not track_ids:
+        return
+
+    update_query = f"""
+    UPDATE {REGISTRY_TABLE}
+    SET last_fetched_at = NOW(),
+        error_count = 0,
+        last_error = NULL
+    WHERE track_id = ANY(%s);
+    """
+
+    try:
+        hook = PostgresHook(postgres_conn_id=postgres_conn_id)
+        conn = hook.get_conn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(update_query, (list(track_ids),))
+                conn.commit()
+        finally:
+            conn.close()
+
+    except Exception as e:
+        logging.error(f"Error Occured When trying to mark track IDs as fetched: {e}")
+        raise
+
+
+def mark_track_ids_failed(track_ids: list[str], error: str, postgres_conn_id='postgres_spotify_conn'):
+    """
+    Record IDs Spotify answered without (missing or null in a successful response):
+    increment error_count and keep the last error message.
+    Whole-request failures (token, rate limit, network) must not be recorded here,
+    otherwise every ID would eventually exceed max_error_count.
+    """
+    if not track_ids:
+        return
+
+    update_query = f"""
+    UPDATE {REGISTRY_TABLE}
+    SET error_count = error_count + 1,
+        last_error = %s
+    WHERE track_id = ANY(%s);
+    """
+
+    try:
+        hook = PostgresHook(postgres_conn_id=postgres_conn_id)
+        conn = hook.get_conn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(update_query, (str(error), list(track_ids)))
+                conn.commit()
+        finally:
+            conn.close()
+
+    except Exception as e:
+        logging.error(f"Error Occured When trying to mark track IDs as failed: {e}")
+        raise
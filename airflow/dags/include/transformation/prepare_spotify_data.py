@@ -8,7 +8,12 @@ from include.helpers import normalize_date,extract_upload_date_from_object_key,v
 # Deffine function to transforming
 
 def transform_tracks_data(data: dict,object_key):
-    """Transform tracks JSON into normalized tables (lists of objects)."""
+    """
+    Transform tracks JSON into normalized tables.
+
+    Each table is a list of tuples ordered as the columns of
+    STG_ARTISTS, STG_ALBUMS and STG_TRACKS respectively.
+    """
 
     # Run validation test to ensure the source data is meeting the expectation
     validation_result = validate_source_data(data,object_key)
@@ -20,6 +25,9 @@ def transform_tracks_data(data: dict,object_key):
     albums_map = {}
     tracks_list = []
 
+    # Every row of a file shares the same upload date
+    created_at = extract_upload_date_from_object_key(object_key)
+
     for track in data.get("tracks", []):
 
         # Track info
@@ -54,46 +62,39 @@ def transform_tracks_data(data: dict,object_key):
             artist_id = None
             artist_name = None
 
-        # Save artist (deduplicated)
+        # Save artist (deduplicated), columns as in STG_ARTISTS
         if artist_id and artist_id not in artists_map:
-            artists_map[artist_id] = {
-                "artist_id": artist_id,
-                "name": artist_name,
-                "created_at": extract_upload_date_from_object_key(object_key)
-            }
+            artists_map[artist_id] = (artist_id, artist_name, created_at)
 
-        # Save album (deduplicated)
+        # Save album (deduplicated), columns as in STG_ALBUMS
         if album_id and album_id not in albums_map:
-            albums_map[album_id] = {
-                "album_id": album_id,
-                "main_artist_id": artist_id,
-                "name": album_name,
-                "release_date": normalize_date(str(release_date)),
-                "release_date_precision": release_precision,
-                "total_tracks": total_tracks,
-                "album_type": album_type,
-                "created_at": extract_upload_date_from_object_key(object_key)
-            }
-
-        # Save track (list) 
-        tracks_list.append({
-            "track_id": track_id,
-            "name": track_name,
-            "artist_id": artist_id,   
-            "album_id": album_id,    
-            "popularity": popularity,
-            "duration_ms": duration_ms,
-            "track_number": track_number,
-            "disc_number": disc_number,
-            "is_local": is_local,
-            "created_at": extract_upload_date_from_object_key(object_key)
-        })
+            albums_map[album_id] = (
+                album_id,
+                artist_id,
+                album_name,
+                release_date,
+                release_precision,
+                total_tracks,
+                album_type,
+                created_at,
+            )
+
+        # Save track (list), columns as in STG_TRACKS
+        tracks_list.append((
+            track_id,
+            track_name,
+            artist_id,
+            album_id,
+            popularity,
+            duration_ms,
+            track_number,
+            disc_number,
+            is_local,
+            created_at,
+        ))
 
     # Convert maps → lists
     artists_list = list(artists_map.values())
     albums_list = list(albums_map.values())
 
-    print(tracks_list[0])
-    print(albums_list[0])
-
     return artists_list,albums_list, tracks_list
\ No newline at end of file
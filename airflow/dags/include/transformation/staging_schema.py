@@ -0,0 +1,67 @@
+from typing import NamedTuple
+
+
+
+# Column-ordered schema shared by the transformation output and the load SQL.
+# Rows are plain tuples in `columns` order: they are far smaller than dicts,
+# need no re-packing before execute_values and serialize through XCom as-is.
+
+class StagingTable(NamedTuple):
+    """Schema of a staging table: name, ordered columns and primary key."""
+
+    name: str
+    columns: tuple
+    pk_column: str
+
+    def upsert_query(self, schema: str = "staging") -> str:
+        """
+        Build the bulk upsert statement for execute_values.
+        Updates every column except the primary key on conflict.
+        """
+        return f"""
+        INSERT INTO {schema}.{self.name} ({', '.join(self.columns)})
+        VALUES %s
+        ON CONFLICT ({self.pk_column}) DO UPDATE SET
+        {', '.join([f"{col} = EXCLUDED.{col}" for col in self.columns if col != self.pk_column])};
+        """
+
+
+STG_ARTISTS = StagingTable(
+    name="stg_artists",
+    columns=("artist_id", "name", "created_at"),
+    pk_column="artist_id",
+)
+
+STG_ALBUMS = StagingTable(
+    name="stg_albums",
+    columns=(
+        "album_id",
+        "main_artist_id",
+        "name",
+        "release_date",
+        "release_date_precision",
+        "total_tracks",
+        "album_type",
+        "created_at",
+    ),
+    pk_column="album_id",
+)
+
+STG_TRACKS = StagingTable(
+    name="stg_tracks",
+    columns=(
+        "track_id",
+        "name",
+        "artist_id",
+        "album_id",
+        "popularity",
+        "duration_ms",
+        "track_number",
+        "disc_number",
+        "is_local",
+        "created_at",
+    ),
+    pk_column="track_id",
+)
+
+STAGING_TABLES = {table.name: table for table in (STG_ARTISTS, STG_ALBUMS, STG_TRACKS)}
@@ -1,10 +1,11 @@
 from airflow.decorators import dag, task
 from airflow.operators.bash import BashOperator
 from airflow.operators.dummy import DummyOperator
-from airflow.operators.python import BranchPythonOperator
+from airflow.operators.python import BranchPythonOperator, get_current_context
 from airflow.providers.postgres.operators.postgres import PostgresOperator
 from airflow.models import Variable
 from airflow.exceptions import AirflowSkipException
+from airflow.utils.state import TaskInstanceState
 
 from datetime import datetime, timedelta
 import logging
@@ -16,7 +17,9 @@ import boto3
 # Custom transformation/load functions
 from include.transformation.prepare_spotify_data import transform_tracks_data
 from include.load_data import load_data_to_postgres
-from include.ingest_spotify_data import read_spotify_ids,fetch_tracks_data,upload_json_to_minio
+from include.ingest_spotify_data import fetch_tracks_data,upload_json_to_minio
+from include.profiling import profile_task,ensure_pg_stat_statements,snapshot_pg_stat_statements,diff_pg_stat_statements,compact_pg_stat_statements,dbt_run_results_generated_at,parse_dbt_run_results,explain_compiled_models,upload_profiling_artifacts,download_profiling_artifact
+from include.track_registry import import_track_ids_from_json,get_due_track_ids,mark_track_ids_fetched,mark_track_ids_failed
 
 
 
@@ -41,6 +44,12 @@ dbt_profiles_dir = os.environ.get("DBT_PROFILES_DIR", "/home/airflow/.dbt")
 TARGET_ENV = Variable.get("TARGET_ENV", default_var="dev")
 ADMIN_EMAIL = Variable.get("ADMIN_EMAIL")
 
+# Opt-in profiling of the transform, load and dbt stages (artifacts stored in MinIO)
+PIPELINE_PROFILING = Variable.get("PIPELINE_PROFILING", default_var="false").lower() == "true"
+
+# Spotify's /tracks endpoint accepts at most 50 IDs per request
+SPOTIFY_TRACKS_BATCH_SIZE = 50
+
 
 
 
@@ -93,8 +102,14 @@ def airflow_dbt_spotify_pipeline():
         bucket_name = "row-data"
 
         try:
-            track_ids = read_spotify_ids(spotify_ids_json_path)
-            logger.info(f"Found {len(track_ids)} track IDs.")
+            # Register any new IDs from the JSON file, then pick the stalest ones for this run
+            import_track_ids_from_json(spotify_ids_json_path)
+            track_ids = get_due_track_ids(limit=SPOTIFY_TRACKS_BATCH_SIZE)
+            logger.info(f"Found {len(track_ids)} track IDs due for refresh.")
+
+            if not track_ids:
+                logger.warning("No track IDs due for refresh. Skipping downstream tasks.")
+                raise AirflowSkipException("No track IDs due for refresh.")
 
             # Extract data from Spotify API
             
@@ -102,14 +117,22 @@ def airflow_dbt_spotify_pipeline():
             logger.info("Fetching tracks data from Spotify API...")
             try:
                 tracks_data = fetch_tracks_data(base_url, track_ids, bearer_token)
-                tracks_list = tracks_data.get("tracks", [])
-                num_tracks = len(tracks_list)
-                logger.info(f"Fetched {num_tracks} tracks successfully.")
-            
             except Exception as e:
+                # Whole-request failures (token, rate limit, network) are not charged to the IDs
                 logger.error(f"Failed to fetch tracks data: {e}")
-                tracks_data = {}
-                tracks_list = []
+                raise
+
+            # Spotify returns null entries for unknown IDs
+            tracks_list = [track for track in tracks_data.get("tracks", []) if track]
+            num_tracks = len(tracks_list)
+            logger.info(f"Fetched {num_tracks} tracks successfully.")
+
+            # Only IDs Spotify answered without are counted as errors
+            fetched_ids = {track["id"] for track in tracks_list}
+            mark_track_ids_failed(
+                [track_id for track_id in track_ids if track_id not in fetched_ids],
+                "Track not returned by Spotify API"
+            )
 
             # Skip DAG if no tracks data or empty list
             if not tracks_list:
@@ -122,13 +145,17 @@ def airflow_dbt_spotify_pipeline():
             
             try:
                 tracks_object_key = upload_json_to_minio(
-                    tracks_data,
+                    {"tracks": tracks_list},
                     bucket_name=bucket_name,
-                    data_category="tracks"
+                    data_category="tracks",
+                    # Each run fetches a different batch, so same-day reruns must not overwrite it
+                    timestamped=True
                 )
 
                 if tracks_object_key:
                     logger.info(f"Tracks data uploaded successfully to '{tracks_object_key}'")
+                    # IDs only become fresh once their data is stored
+                    mark_track_ids_fetched(list(fetched_ids))
 
                 else:
                     logger.warning("Tracks data upload returned empty object key.")
@@ -188,9 +215,15 @@ def airflow_dbt_spotify_pipeline():
                 if "tracks" in object_key:
 
                     if data:  # Only transform if data is not empty
-                        transformed_artists_data, transformed_albums_data, transformed_tracks_data = transform_tracks_data(
-                            data, object_key
-                        )
+                        context = get_current_context()
+                        with profile_task(
+                            PIPELINE_PROFILING,
+                            context["run_id"],
+                            f"{context['ti'].task_id}/{os.path.basename(object_key)}"
+                        ):
+                            transformed_artists_data, transformed_albums_data, transformed_tracks_data = transform_tracks_data(
+                                data, object_key
+                            )
                         logger.info(
                             f"Transformed {len(transformed_artists_data)} artits, {len(transformed_tracks_data)} tracks and {len(transformed_albums_data)} albums"
                         )
@@ -204,11 +237,11 @@ def airflow_dbt_spotify_pipeline():
         return transformed_artists_data, transformed_albums_data, transformed_tracks_data
     
     
-    # Task 3: Create Database and Staging Tables
+    # Task 3: Create Database, Staging Tables and Serving Layer views
     create_db_and_staging_tables = PostgresOperator(
         task_id="create_spotify_db_and_staging_tables",
         postgres_conn_id="postgres_spotify_conn",
-        sql="include/create_database_schema.sql",
+        sql=["include/create_database_schema.sql", "include/create_serving_layer.sql"],
         autocommit=True,
     )
 
@@ -223,37 +256,60 @@ def airflow_dbt_spotify_pipeline():
         try:
             artists_data, albums_data, tracks_data = transformed_data
 
-            loaded = False  # Flag to check if any table got loaded
+            context = get_current_context()
+            pg_stats_before = []
+            if PIPELINE_PROFILING and ensure_pg_stat_statements():
+                pg_stats_before = snapshot_pg_stat_statements()
 
-            if artists_data:
-                load_data_to_postgres("stg_artists", artists_data, "artist_id")
-                logger.info(f"Loaded {len(artists_data)} records into stg_artists.")
-                loaded = True
-            else:
-                logger.warning("No artists data to load.")
+            with profile_task(PIPELINE_PROFILING, context["run_id"], context["ti"].task_id) as artifacts:
+                plan_artifacts = artifacts if PIPELINE_PROFILING else None
 
-            if albums_data:
-                load_data_to_postgres("stg_albums", albums_data, "album_id")
-                logger.info(f"Loaded {len(albums_data)} records into stg_albums.")
-                loaded = True
-            else:
-                logger.warning("No albums data to load.")
+                loaded = False  # Flag to check if any table got loaded
 
-            if tracks_data:
-                load_data_to_postgres("stg_tracks", tracks_data, "track_id")
-                logger.info(f"Loaded {len(tracks_data)} records into stg_tracks.")
-                loaded = True
-            else:
-                logger.warning("No tracks data to load.")
+                if artists_data:
+                    load_data_to_postgres("stg_artists", artists_data, plan_artifacts=plan_artifacts)
+                    logger.info(f"Loaded {len(artists_data)} records into stg_artists.")
+                    loaded = True
+                else:
+                    logger.warning("No artists data to load.")
+
+                if albums_data:
+                    load_data_to_postgres("stg_albums", albums_data, plan_artifacts=plan_artifacts)
+                    logger.info(f"Loaded {len(albums_data)} records into stg_albums.")
+                    loaded = True
+                else:
+                    logger.warning("No albums data to load.")
+
+                if tracks_data:
+                    load_data_to_postgres("stg_tracks", tracks_data, plan_artifacts=plan_artifacts)
+                    logger.info(f"Loaded {len(tracks_data)} records into stg_tracks.")
+                    loaded = True
+                else:
+                    logger.warning("No tracks data to load.")
 
-            if not loaded:
-                logger.warning("No data was loaded. All input lists are empty or None.")
+                if not loaded:
+                    logger.warning("No data was loaded. All input lists are empty or None.")
+
+                if PIPELINE_PROFILING:
+                    pg_stats_after = snapshot_pg_stat_statements()
+                    artifacts["pg_stat_statements_delta.json"] = diff_pg_stat_statements(pg_stats_before, pg_stats_after)
+                    # Baseline for the dbt modelling delta collected by collect_modelling_profile
+                    artifacts["pg_stat_statements_baseline.json"] = compact_pg_stat_statements(pg_stats_after)
 
         except Exception as e:
             logger.error(f"Error while loading processed data into staging: {e}")
             raise
 
 
+    # Task 4b: Refresh Serving Layer without blocking dashboard reads
+    refresh_serving_layer = PostgresOperator(
+        task_id="refresh_serving_layer",
+        postgres_conn_id="postgres_spotify_conn",
+        sql="include/refresh_serving_layer.sql",
+        autocommit=True,
+    )
+
+
     # Branching: Decide to Run DBT Tests
     def branch_func():
         """
@@ -285,17 +341,76 @@ def airflow_dbt_spotify_pipeline():
     skip_dbt_test_staging_data = DummyOperator(task_id="skip_dbt_test_staging_data")
 
 
-    # Task 7: Run DBT Models
+    # Task 7: Run DBT Models (dbt writes a cProfile of its own run when profiling is on)
+    dbt_run_command = f"dbt run --select path:models --target {TARGET_ENV}"
+    if PIPELINE_PROFILING:
+        # Clear the previous run's artifacts so they can never be collected as this run's
+        dbt_run_command = (
+            "rm -rf target/run_results.json target/dbt_timing.prof target/compiled && "
+            f"{dbt_run_command} --record-timing-info target/dbt_timing.prof"
+        )
     modelling = BashOperator(
         task_id="modelling",
-        bash_command=f"dbt deps && dbt run --select path:models --target {TARGET_ENV}",
+        bash_command=f"dbt deps && {dbt_run_command}",
         cwd=f"{dbt_project_dir}",
         env={**os.environ, #inherit all container env vars
             "DBT_PROFILES_DIR": dbt_profiles_dir},
         trigger_rule="one_success",  # Run if either branch succeeds
     )
 
-    
+
+    # Task 8: Collect dbt Profiling Artifacts
+    @task(task_id="collect_modelling_profile", trigger_rule="all_done")
+    def collect_modelling_profile():
+        """
+        Store dbt model timings, the dbt cProfile, mart query plans and the
+        pg_stat_statements delta since the staging load as run artifacts.
+        """
+        if not PIPELINE_PROFILING:
+            raise AirflowSkipException("Pipeline profiling is disabled.")
+
+        context = get_current_context()
+
+        # all_done also fires when modelling was skipped (e.g. no IDs due): nothing to collect then
+        modelling_ti = context["dag_run"].get_task_instance("modelling")
+        if not modelling_ti or modelling_ti.state not in (TaskInstanceState.SUCCESS, TaskInstanceState.FAILED):
+            raise AirflowSkipException("dbt modelling did not run in this DAG run.")
+
+        target_dir = os.path.join(dbt_project_dir, "target")
+        artifacts = {}
+
+        try:
+            # Closing snapshot first, so the EXPLAIN ANALYZE runs below are not measured
+            pg_stats_after = snapshot_pg_stat_statements()
+
+            # Delta covers everything since the end of the staging load (dbt tests and models)
+            pg_stats_before = download_profiling_artifact(
+                context["run_id"], "load_processed_data_into_staging", "pg_stat_statements_baseline.json"
+            ) or []
+            artifacts["pg_stat_statements_delta.json"] = diff_pg_stat_statements(pg_stats_before, pg_stats_after)
+
+            # Only trust dbt artifacts written by this run's dbt invocation
+            run_results_path = os.path.join(target_dir, "run_results.json")
+            generated_at = dbt_run_results_generated_at(run_results_path) if os.path.exists(run_results_path) else None
+            if generated_at and generated_at >= modelling_ti.start_date:
+                artifacts["dbt_model_timings.json"] = parse_dbt_run_results(run_results_path)
+
+                timing_info_path = os.path.join(target_dir, "dbt_timing.prof")
+                if os.path.exists(timing_info_path):
+                    with open(timing_info_path, "rb") as f:
+                        artifacts["dbt_cprofile.prof"] = f.read()
+
+                compiled_marts_dir = os.path.join(target_dir, "compiled", "spotify_dbt_data_pipeline", "models", "mart")
+                artifacts["explain_mart_models.json"] = explain_compiled_models(compiled_marts_dir)
+            else:
+                logger.warning(f"No dbt run results from this run found at '{run_results_path}'.")
+
+            upload_profiling_artifacts(artifacts, context["run_id"], "modelling")
+
+        except Exception as e:
+            logger.error(f"Error while collecting dbt profiling artifacts: {e}")
+            raise
+
     
     # Define Task Dependencies
 
@@ -303,9 +418,9 @@ def airflow_dbt_spotify_pipeline():
     ingest_task = ingest_spotify_data_to_minio()
     staging_data_task = prepare_staging_data()
 
-    # Data ingestion -> staging -> create tables -> load data -> branch
-    ingest_task >> staging_data_task >> create_db_and_staging_tables
-    create_db_and_staging_tables >> load_processed_data_into_staging(staging_data_task) >> branch_task
+    # Create tables (incl. track ID registry) -> data ingestion -> staging -> load data -> branch
+    create_db_and_staging_tables >> ingest_task >> staging_data_task
+    load_processed_data_into_staging(staging_data_task) >> [refresh_serving_layer, branch_task]
 
     # Branching DBT test
     branch_task >> [dbt_test_staging_data, skip_dbt_test_staging_data]
@@ -314,6 +429,9 @@ def airflow_dbt_spotify_pipeline():
     dbt_test_staging_data >> modelling
     skip_dbt_test_staging_data >> modelling
 
+    # Profiling artifacts of the dbt run (skipped unless PIPELINE_PROFILING is on)
+    modelling >> collect_modelling_profile()
+
 
 
 airflow_dbt_spotify_pipeline()
@@ -0,0 +1,80 @@
+"""
+Memory benchmark: dict rows vs column-ordered tuple rows for the
+transform -> load handoff of stg_tracks.
+
+The dict path mirrors the previous pipeline: one dict per track, then a
+second list of tuples rebuilt from the dict keys before execute_values.
+The tuple path builds rows once in STG_TRACKS column order.
+
+Usage:
+    python benchmarks/staging_records_memory.py [num_tracks]   (default 1,000,000)
+"""
+import gc
+import os
+import sys
+import tracemalloc
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "airflow", "dags"))
+
+from include.transformation.staging_schema import STG_TRACKS  # noqa: E402
+
+
+CREATED_AT = date(2026, 2, 7)
+
+
+def track_values(i: int) -> tuple:
+    """Synthetic track values in STG_TRACKS column order."""
+    return (
+        f"track{i:018d}",
+        f"Track name {i}",
+        f"artist{i % 5000:017d}",
+        f"album{i % 50000:018d}",
+        i % 101,
+        180000 + i % 120000,
+        1 + i % 20,
+        1,
+        False,
+        CREATED_AT,
+    )
+
+
+def build_dict_rows(num_tracks: int):
+    rows = [dict(zip(STG_TRACKS.columns, track_values(i))) for i in range(num_tracks)]
+    # Load step used to re-read the keys and rebuild tuples for execute_values
+    columns = list(rows[0].keys())
+    values = [tuple(row[col] for col in columns) for row in rows]
+    return rows, values
+
+
+def build_tuple_rows(num_tracks: int):
+    return [track_values(i) for i in range(num_tracks)]
+
+
+def measure(builder, num_tracks: int) -> tuple[float, float]:
+    """Return (retained MiB, peak MiB) allocated while building rows."""
+    gc.collect()
+    tracemalloc.start()
+    result = builder(num_tracks)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    gc.collect()
+    return current / 2**20, peak / 2**20
+
+
+def main():
+    num_tracks = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    dict_current, dict_peak = measure(build_dict_rows, num_tracks)
+    tuple_current, tuple_peak = measure(build_tuple_rows, num_tracks)
+
+    print(f"stg_tracks rows: {num_tracks:,}")
+    print(f"{'representation':<26}{'retained MiB':>14}{'peak MiB':>12}")
+    print(f"{'dict rows + load tuples':<26}{dict_current:>14.1f}{dict_peak:>12.1f}")
+    print(f"{'column-ordered tuples':<26}{tuple_current:>14.1f}{tuple_peak:>12.1f}")
+    print(f"retained memory saved: {100 * (1 - tuple_current / dict_current):.1f}%")
+
+
+if __name__ == "__main__":
+    main()